@@ -1,15 +1,21 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Cookie, Response
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Cookie, Depends, Request, Response
 from dotenv import load_dotenv
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
-from supabase import create_client, Client
+from supabase._async.client import AsyncClient, create_client
 import os
 import logging
 from pathlib import Path
+from contextlib import asynccontextmanager, suppress
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, List, Optional
 from datetime import datetime, timezone, timedelta
 from openai import AsyncOpenAI
+from redis.asyncio import Redis
 import httpx
+import orjson
+import asyncio
+import hashlib
 
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
@@ -17,13 +23,118 @@ load_dotenv(ROOT_DIR / '.env')
 # Supabase connection
 supabase_url = os.environ.get('VITE_SUPABASE_URL')
 supabase_key = os.environ.get('VITE_SUPABASE_SUPABASE_ANON_KEY')
-supabase: Client = create_client(supabase_url, supabase_key)
+supabase: Optional[AsyncClient] = None  # created in lifespan
 
 # OpenAI API Key
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
-app = FastAPI()
+# Redis cache (optional)
+REDIS_URL = os.environ.get('REDIS_URL', '')
+redis_client = Redis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+SESSION_CACHE_TTL = 60
+
+# Per-process session cache: token -> (user, valid_until). Logout only clears the
+# worker that served it (plus Redis), so the TTL is also the revocation window on
+# every other worker and has to stay short.
+LOCAL_SESSION_CACHE_TTL = 5
+LOCAL_SESSION_CACHE_SIZE = 10_000
+local_session_cache: dict = {}
+USER_DATA_CACHE_TTL = 15
+
+# Outbound HTTP client settings
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+# Most recent chats returned by /chat/history
+CHAT_HISTORY_LIMIT = 100
+
+# Number of most recent messages (including the new one) sent to the model per chat turn
+CHAT_CONTEXT_MESSAGES = 20
+
+# Uvicorn worker processes; must match the real count when started another way
+WORKERS = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+
+# OpenAI concurrency limits. The semaphores live in each worker process, so the
+# account-wide cap is split across workers to keep the deployment under the
+# provider rate limit. The per-user cap is per worker: a user whose requests land
+# on several workers can have up to WORKERS * OPENAI_USER_CONCURRENCY in flight.
+OPENAI_GLOBAL_CONCURRENCY = 50
+OPENAI_USER_CONCURRENCY = 2
+openai_semaphore = asyncio.Semaphore(max(1, OPENAI_GLOBAL_CONCURRENCY // WORKERS))
+# user_id -> [semaphore, holders]; an entry is dropped once nobody holds or awaits it
+user_openai_slots: dict = {}
+
+# OpenAI system prompts. Topic-independent instructions come first and variable
+# parts go last so repeated requests share a long prefix for OpenAI prompt caching.
+CHAT_SYS_PREFIX = "You are an expert AI tutor helping users learn about "
+CHAT_SYS_SUFFIX = ". Provide clear, engaging explanations with examples. Keep responses concise but informative."
+
+QUIZ_SYSTEM_MESSAGE = """You are an expert quiz generator. Generate the requested number of multiple-choice questions about the requested topic.
+
+Return a JSON object with a "questions" key whose value is an array of objects with this exact structure:
+        {
+          "questions": [
+            {
+              "question": "Question text here?",
+              "options": ["Option A", "Option B", "Option C", "Option D"],
+              "correct_answer": "Option A",
+              "explanation": "Brief explanation why this is correct"
+            }
+          ]
+        }
+
+Make sure questions are educational, clear, and have distinct options."""
+
+SUMMARY_SYSTEM_MESSAGE = "You are an expert at creating concise, informative summaries. Summarize the given content in under 150 words, highlighting key points and main ideas."
+
+# Seconds between background deletes of expired sessions
+SESSION_SWEEP_INTERVAL = 300
+
+async def claim_session_sweep() -> bool:
+    # Every worker runs the sweeper; with Redis only the first one per interval deletes
+    if not redis_client:
+        return True
+
+    try:
+        return bool(await redis_client.set("lock:session_sweep", os.getpid(), nx=True, ex=SESSION_SWEEP_INTERVAL - 1))
+    except Exception as e:
+        logging.warning(f"Session sweep lock error: {e}")
+        return True
+
+async def sweep_expired_sessions():
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        if not await claim_session_sweep():
+            continue
+        try:
+            await supabase.table('sessions').delete().lt('expires_at', datetime.now(timezone.utc).isoformat()).execute()
+        except Exception as e:
+            logging.error(f"Session sweep error: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global supabase
+    supabase = await create_client(supabase_url, supabase_key)
+
+    # Shared HTTP client so outbound calls reuse keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=HTTP_LIMITS,
+        http2=True
+    )
+
+    # Expired sessions are purged here instead of on the auth path
+    sweeper = asyncio.create_task(sweep_expired_sessions())
+    yield
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
+    await app.state.http.aclose()
+    if redis_client:
+        await redis_client.aclose()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # Request/Response Models
@@ -34,6 +145,7 @@ class ChatRequest(BaseModel):
     message: str
     topic: str
     chat_id: Optional[str] = None
+    stream: bool = False
 
 class QuizRequest(BaseModel):
     topic: str
@@ -41,6 +153,16 @@ class QuizRequest(BaseModel):
 
 class SummaryRequest(BaseModel):
     content: str
+    stream: bool = False
+
+class QuizQuestion(BaseModel):
+    question: str
+    options: List[str]
+    correct_answer: str
+    explanation: str
+
+class GeneratedQuiz(BaseModel):
+    questions: List[QuizQuestion]
 
 class SaveQuizRequest(BaseModel):
     topic: str
@@ -52,78 +174,195 @@ class UpdateInterestsRequest(BaseModel):
     interests: List[str]
 
 # Helper Functions
+async def cache_get(key: str) -> Optional[Any]:
+    if not redis_client:
+        return None
+
+    try:
+        cached = await redis_client.get(key)
+        return orjson.loads(cached) if cached else None
+    except Exception as e:
+        logging.warning(f"Cache read error for {key}: {e}")
+        return None
+
+async def cache_set(key: str, value, ttl: int):
+    if not redis_client:
+        return
+
+    try:
+        await redis_client.set(key, orjson.dumps(value), ex=ttl)
+    except Exception as e:
+        logging.warning(f"Cache write error for {key}: {e}")
+
+async def cache_delete(*keys: str):
+    if not redis_client:
+        return
+
+    try:
+        await redis_client.delete(*keys)
+    except Exception as e:
+        logging.warning(f"Cache delete error for {keys}: {e}")
+
+@asynccontextmanager
+async def openai_slot(user_id: str):
+    slot = user_openai_slots.get(user_id)
+    if slot is None:
+        slot = user_openai_slots[user_id] = [asyncio.Semaphore(OPENAI_USER_CONCURRENCY), 0]
+
+    slot[1] += 1
+    try:
+        async with slot[0], openai_semaphore:
+            yield
+    finally:
+        slot[1] -= 1
+        if not slot[1]:
+            del user_openai_slots[user_id]
+
+def sse_event(payload: dict) -> str:
+    return f"data: {orjson.dumps(payload).decode()}\n\n"
+
+async def increment_progress(user_id: str, xp: int, topic: Optional[str] = None):
+    await supabase.rpc('increment_progress', {'uid': user_id, 'dxp': xp, 'topic': topic}).execute()
+    await cache_delete(f"prog:{user_id}")
+
+async def save_chat_turn(chat_id: str, user_message: dict, response: str) -> dict:
+    # Add AI response
+    assistant_message = {
+        'role': 'assistant',
+        'content': response,
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
+
+    # Append only the new turn
+    await supabase.table('chat_messages').insert([
+        {'chat_id': chat_id, **user_message},
+        {'chat_id': chat_id, **assistant_message}
+    ]).execute()
+
+    return assistant_message
+
+def cache_session_locally(session_token: str, user: dict, expires_at: datetime, now: datetime):
+    if session_token not in local_session_cache and len(local_session_cache) >= LOCAL_SESSION_CACHE_SIZE:
+        # Evict the oldest entry (dicts keep insertion order)
+        local_session_cache.pop(next(iter(local_session_cache)))
+    local_session_cache[session_token] = (user, min(expires_at, now + timedelta(seconds=LOCAL_SESSION_CACHE_TTL)))
+
+async def cache_session(session_token: str, user: dict, expires_at: datetime):
+    if not redis_client:
+        return
+
+    # usess:{user_id} tracks the user's cached tokens so user updates can drop them all
+    user_key = f"usess:{user['id']}"
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(f"sess:{session_token}", orjson.dumps({'user': user, 'expires_at': expires_at.isoformat()}), ex=SESSION_CACHE_TTL)
+            pipe.sadd(user_key, session_token)
+            pipe.expire(user_key, SESSION_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logging.warning(f"Cache write error for session of {user['id']}: {e}")
+
+async def forget_session(session_token: str):
+    local_session_cache.pop(session_token, None)
+    await cache_delete(f"sess:{session_token}")
+
+async def forget_user_sessions(user_id: str):
+    # Other workers' local copies expire within LOCAL_SESSION_CACHE_TTL
+    for token in [token for token, (user, _) in local_session_cache.items() if user.get('id') == user_id]:
+        local_session_cache.pop(token, None)
+
+    if not redis_client:
+        return
+
+    user_key = f"usess:{user_id}"
+    try:
+        tokens = await redis_client.smembers(user_key)
+        await redis_client.delete(user_key, *(f"sess:{token}" for token in tokens))
+    except Exception as e:
+        logging.warning(f"Cache delete error for sessions of {user_id}: {e}")
+
 async def get_user_from_token(session_token: Optional[str]) -> Optional[dict]:
     if not session_token:
         return None
 
+    cache_key = f"sess:{session_token}"
+    now = datetime.now(timezone.utc)
+
+    # In-process cache first, no network hop at all
+    local = local_session_cache.get(session_token)
+    if local and local[1] >= now:
+        return local[0]
+
     try:
-        # Get session
-        session_response = supabase.table('sessions').select('*').eq('session_token', session_token).maybeSingle().execute()
+        # Then the shared cache while the session is still valid
+        cached = await cache_get(cache_key)
+        if cached:
+            expires_at = datetime.fromisoformat(cached['expires_at'])
+            if expires_at >= now:
+                cache_session_locally(session_token, cached['user'], expires_at, now)
+                return cached['user']
+
+        # Get the unexpired session with its user embedded (via the sessions.user_id foreign key).
+        # Expired rows match nothing here and are removed by sweep_expired_sessions.
+        session_response = await supabase.table('sessions').select('*, users(*)').eq('session_token', session_token).gte('expires_at', now.isoformat()).maybe_single().execute()
 
         if not session_response.data:
             return None
 
         session = session_response.data
-
-        # Check if session expired
         expires_at = datetime.fromisoformat(session['expires_at'].replace('Z', '+00:00'))
-        if expires_at < datetime.now(timezone.utc):
-            supabase.table('sessions').delete().eq('session_token', session_token).execute()
-            return None
+        user = session.get('users')
 
-        # Get user
-        user_response = supabase.table('users').select('*').eq('id', session['user_id']).maybeSingle().execute()
+        if user:
+            cache_session_locally(session_token, user, expires_at, now)
+            await cache_session(session_token, user, expires_at)
 
-        return user_response.data
+        return user
     except Exception as e:
         logging.error(f"Error getting user from token: {e}")
         return None
 
+async def current_user(session_token: Optional[str] = Cookie(None)) -> dict:
+    user = await get_user_from_token(session_token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user
+
 # Auth Endpoints
 @api_router.post("/auth/session")
-async def process_session(request: SessionDataRequest, response: Response):
+async def process_session(request: SessionDataRequest, response: Response, http_request: Request):
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers={"X-Session-ID": request.session_id},
-                timeout=10.0
-            )
-
-            if resp.status_code != 200:
-                raise HTTPException(status_code=400, detail="Invalid session ID")
+        resp = await http_request.app.state.http.get(
+            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+            headers={"X-Session-ID": request.session_id}
+        )
 
-            data = resp.json()
+        if resp.status_code != 200:
+            raise HTTPException(status_code=400, detail="Invalid session ID")
 
-        # Check if user exists
-        existing_user_response = supabase.table('users').select('*').eq('email', data['email']).maybeSingle().execute()
+        data = orjson.loads(resp.content)
+        now = datetime.now(timezone.utc)
 
-        if not existing_user_response.data:
-            # Create new user
-            user_data = {
-                'email': data['email'],
-                'name': data['name'],
-                'picture': data.get('picture'),
-                'learning_interests': []
-            }
-            user_response = supabase.table('users').insert(user_data).execute()
-            user = user_response.data[0]
+        # Create or refresh the user atomically (users.email is unique)
+        user_data = {
+            'email': data['email'],
+            'name': data['name'],
+            'picture': data.get('picture')
+        }
+        user_response = await supabase.table('users').upsert(user_data, on_conflict='email').execute()
+        user = user_response.data[0]
 
-            # Create initial progress
-            progress_data = {
-                'user_id': user['id'],
-                'xp_points': 0,
-                'topics_learned': [],
-                'learning_streak': 0,
-                'last_activity': datetime.now(timezone.utc).isoformat()
-            }
-            supabase.table('progress').insert(progress_data).execute()
-        else:
-            user = existing_user_response.data
+        # Create initial progress if missing (progress.user_id is unique; last_activity defaults to now())
+        progress_data = {
+            'user_id': user['id'],
+            'xp_points': 0,
+            'topics_learned': [],
+            'learning_streak': 0
+        }
 
         # Create session
         session_token = data['session_token']
-        expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+        expires_at = now + timedelta(days=7)
 
         session_data = {
             'session_token': session_token,
@@ -131,7 +370,11 @@ async def process_session(request: SessionDataRequest, response: Response):
             'expires_at': expires_at.isoformat()
         }
 
-        supabase.table('sessions').insert(session_data).execute()
+        # Both only depend on the user id, so write them concurrently
+        await asyncio.gather(
+            supabase.table('progress').upsert(progress_data, on_conflict='user_id', ignore_duplicates=True).execute(),
+            supabase.table('sessions').insert(session_data).execute()
+        )
 
         # Set cookie
         response.set_cookie(
@@ -155,16 +398,15 @@ async def process_session(request: SessionDataRequest, response: Response):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api_router.get("/auth/me")
-async def get_current_user(session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    return user
+async def get_current_user(user: dict = Depends(current_user)):
+    # Plain JSON rows: skip FastAPI's jsonable_encoder pass
+    return ORJSONResponse(user)
 
 @api_router.post("/auth/logout")
 async def logout(response: Response, session_token: Optional[str] = Cookie(None)):
     if session_token:
-        supabase.table('sessions').delete().eq('session_token', session_token).execute()
+        await supabase.table('sessions').delete().eq('session_token', session_token).execute()
+        await forget_session(session_token)
 
     response.delete_cookie(
         key="session_token",
@@ -176,92 +418,101 @@ async def logout(response: Response, session_token: Optional[str] = Cookie(None)
     return {"message": "Logged out successfully"}
 
 @api_router.put("/auth/interests")
-async def update_interests(request: UpdateInterestsRequest, session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    supabase.table('users').update({'learning_interests': request.interests}).eq('id', user['id']).execute()
+async def update_interests(request: UpdateInterestsRequest, user: dict = Depends(current_user)):
+    await supabase.table('users').update({'learning_interests': request.interests}).eq('id', user['id']).execute()
+    # Every session of this user caches the old user row, not just the caller's
+    await forget_user_sessions(user['id'])
 
     return {"message": "Interests updated"}
 
 # AI Chat Endpoints
 @api_router.post("/chat")
-async def chat_with_ai(request: ChatRequest, session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
+async def chat_with_ai(request: ChatRequest, background_tasks: BackgroundTasks, user: dict = Depends(current_user)):
     try:
-        # Get or create chat history
+        # Get existing chat and its messages, or create a new chat
         chat_id = request.chat_id
+        messages = []
         if chat_id:
-            chat_response = supabase.table('chat_history').select('*').eq('id', chat_id).maybeSingle().execute()
-            chat_history = chat_response.data
+            chat_response, history_response = await asyncio.gather(
+                supabase.table('chat_history').select('id').eq('id', chat_id).eq('user_id', user['id']).maybe_single().execute(),
+                supabase.table('chat_messages').select('role,content').eq('chat_id', chat_id).order('timestamp', desc=True).limit(CHAT_CONTEXT_MESSAGES - 1).execute()
+            )
+            # Messages are only used once the chat is confirmed to be the caller's
+            if not chat_response.data:
+                raise HTTPException(status_code=404, detail="Chat not found")
+            messages = history_response.data[::-1]
         else:
-            chat_history = None
-
-        if not chat_history:
             # Create new chat
             chat_data = {
                 'user_id': user['id'],
-                'topic': request.topic,
-                'messages': []
+                'topic': request.topic
             }
-            chat_response = supabase.table('chat_history').insert(chat_data).execute()
-            chat_history = chat_response.data[0]
-            chat_id = chat_history['id']
+            chat_response = await supabase.table('chat_history').insert(chat_data).execute()
+            chat_id = chat_response.data[0]['id']
+            await cache_delete(f"chist:{user['id']}")
 
         # Add user message
-        messages = chat_history.get('messages', [])
         user_message = {
             'role': 'user',
             'content': request.message,
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
-        messages.append(user_message)
 
         # Create AI chat
         if not openai_client:
             raise HTTPException(status_code=503, detail="AI service not configured")
 
-        system_message = f"You are an expert AI tutor helping users learn about {request.topic}. Provide clear, engaging explanations with examples. Keep responses concise but informative."
+        system_message = CHAT_SYS_PREFIX + request.topic + CHAT_SYS_SUFFIX
 
-        # Build conversation history for OpenAI
-        openai_messages = [{"role": "system", "content": system_message}]
-        for msg in messages:
-            openai_messages.append({"role": msg["role"], "content": msg["content"]})
+        # Build conversation history for OpenAI; stored rows are already {role, content}
+        openai_messages = [
+            {"role": "system", "content": system_message},
+            *messages,
+            {"role": "user", "content": request.message}
+        ]
+
+        # Stream the reply as server-sent events, persisting once it completes
+        if request.stream:
+            async def event_stream():
+                chunks = []
+                # The chat row already exists; tell the client before anything can fail
+                yield sse_event({"chat_id": chat_id})
+                try:
+                    # Hold the slot for the whole generation, not just the request that starts it
+                    async with openai_slot(user['id']):
+                        completion = await openai_client.chat.completions.create(
+                            model="gpt-4o-mini",
+                            messages=openai_messages,
+                            stream=True
+                        )
+                        async for chunk in completion:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                chunks.append(delta)
+                                yield sse_event({"delta": delta})
+
+                    assistant_message = await save_chat_turn(chat_id, user_message, ''.join(chunks))
+                    # Queued only on success; runs once the stream has closed
+                    background_tasks.add_task(increment_progress, user['id'], 10, request.topic)
+                    yield sse_event({"done": True, "chat_id": chat_id, "timestamp": assistant_message['timestamp']})
+                except Exception as e:
+                    logging.error(f"Chat stream error: {e}")
+                    yield sse_event({"error": "Chat stream failed"})
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream", background=background_tasks)
 
         # Send message to OpenAI
-        completion = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=openai_messages
-        )
+        async with openai_slot(user['id']):
+            completion = await openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=openai_messages
+            )
         response = completion.choices[0].message.content
 
-        # Add AI response
-        assistant_message = {
-            'role': 'assistant',
-            'content': response,
-            'timestamp': datetime.now(timezone.utc).isoformat()
-        }
-        messages.append(assistant_message)
-
-        # Save to database
-        supabase.table('chat_history').update({'messages': messages}).eq('id', chat_id).execute()
+        assistant_message = await save_chat_turn(chat_id, user_message, response)
 
-        # Update progress
-        progress_response = supabase.table('progress').select('*').eq('user_id', user['id']).maybeSingle().execute()
-        if progress_response.data:
-            progress = progress_response.data
-            new_xp = progress['xp_points'] + 10
-            topics = list(set(progress.get('topics_learned', []) + [request.topic]))
-
-            supabase.table('progress').update({
-                'xp_points': new_xp,
-                'topics_learned': topics,
-                'last_activity': datetime.now(timezone.utc).isoformat()
-            }).eq('user_id', user['id']).execute()
+        # XP is eventually consistent, so award it after the response is sent
+        background_tasks.add_task(increment_progress, user['id'], 10, request.topic)
 
         return {
             "chat_id": chat_id,
@@ -269,80 +520,62 @@ async def chat_with_ai(request: ChatRequest, session_token: Optional[str] = Cook
             "timestamp": assistant_message['timestamp']
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/chat/history")
-async def get_chat_history(session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+async def get_chat_history(user: dict = Depends(current_user)):
+    cache_key = f"chist:{user['id']}"
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return cached
 
-    response = supabase.table('chat_history').select('*').eq('user_id', user['id']).order('created_at', desc=True).execute()
+    # List metadata only; full messages are served by /chat/{chat_id}
+    response = await supabase.table('chat_history').select('id,topic,created_at').eq('user_id', user['id']).order('created_at', desc=True).limit(CHAT_HISTORY_LIMIT).execute()
+    await cache_set(cache_key, response.data, USER_DATA_CACHE_TTL)
 
     return response.data
 
 @api_router.get("/chat/{chat_id}")
-async def get_single_chat(chat_id: str, session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    response = supabase.table('chat_history').select('*').eq('id', chat_id).eq('user_id', user['id']).maybeSingle().execute()
+async def get_single_chat(chat_id: str, user: dict = Depends(current_user)):
+    response, messages_response = await asyncio.gather(
+        supabase.table('chat_history').select('id,user_id,topic,created_at').eq('id', chat_id).eq('user_id', user['id']).maybe_single().execute(),
+        supabase.table('chat_messages').select('role,content,timestamp').eq('chat_id', chat_id).order('timestamp').execute()
+    )
 
     if not response.data:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    return response.data
+    return {**response.data, "messages": messages_response.data}
 
 # Quiz Generation Endpoint
 @api_router.post("/quiz/generate")
-async def generate_quiz(request: QuizRequest, session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
+async def generate_quiz(request: QuizRequest, user: dict = Depends(current_user)):
     try:
         if not openai_client:
             raise HTTPException(status_code=503, detail="AI service not configured")
 
-        system_message = f"""You are an expert quiz generator. Generate {request.num_questions} multiple-choice questions about {request.topic}.
-
-Return ONLY a valid JSON array of objects with this exact structure:
-        [
-          {{
-            "question": "Question text here?",
-            "options": ["Option A", "Option B", "Option C", "Option D"],
-            "correct_answer": "Option A",
-            "explanation": "Brief explanation why this is correct"
-          }}
-        ]
-
-Make sure questions are educational, clear, and have distinct options."""
-
-        completion = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Generate {request.num_questions} quiz questions about {request.topic}"}
-            ]
-        )
+        async with openai_slot(user['id']):
+            completion = await openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": QUIZ_SYSTEM_MESSAGE},
+                    {"role": "user", "content": f"Generate {request.num_questions} quiz questions about {request.topic}"}
+                ],
+                response_format={"type": "json_object"}
+            )
         response = completion.choices[0].message.content
 
-        # Parse JSON response
-        import json
-        response_text = response.strip()
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0]
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0]
-
-        questions = json.loads(response_text)
+        # JSON mode guarantees a bare JSON object, no code fences to strip;
+        # parse and validate it in one pass
+        quiz = GeneratedQuiz.model_validate_json(response)
 
         return {
             "topic": request.topic,
-            "questions": questions
+            "questions": quiz.questions
         }
 
     except Exception as e:
@@ -350,11 +583,7 @@ Make sure questions are educational, clear, and have distinct options."""
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/quiz/save")
-async def save_quiz_result(request: SaveQuizRequest, session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
+async def save_quiz_result(request: SaveQuizRequest, user: dict = Depends(current_user)):
     quiz_data = {
         'user_id': user['id'],
         'topic': request.topic,
@@ -363,61 +592,73 @@ async def save_quiz_result(request: SaveQuizRequest, session_token: Optional[str
         'questions': request.questions
     }
 
-    supabase.table('quiz_results').insert(quiz_data).execute()
-
-    # Update progress
+    # Save result and update progress concurrently
     xp_earned = request.score * 20
-    progress_response = supabase.table('progress').select('*').eq('user_id', user['id']).maybeSingle().execute()
-
-    if progress_response.data:
-        new_xp = progress_response.data['xp_points'] + xp_earned
-        supabase.table('progress').update({
-            'xp_points': new_xp,
-            'last_activity': datetime.now(timezone.utc).isoformat()
-        }).eq('user_id', user['id']).execute()
+    await asyncio.gather(
+        supabase.table('quiz_results').insert(quiz_data).execute(),
+        increment_progress(user['id'], xp_earned)
+    )
+    await cache_delete(f"qres:{user['id']}")
 
     return {"message": "Quiz result saved", "xp_earned": xp_earned}
 
 @api_router.get("/quiz/results")
-async def get_quiz_results(session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+async def get_quiz_results(user: dict = Depends(current_user)):
+    cache_key = f"qres:{user['id']}"
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return cached
 
-    response = supabase.table('quiz_results').select('*').eq('user_id', user['id']).order('created_at', desc=True).execute()
+    response = await supabase.table('quiz_results').select('*').eq('user_id', user['id']).order('created_at', desc=True).execute()
+    await cache_set(cache_key, response.data, USER_DATA_CACHE_TTL)
 
     return response.data
 
 # Summarization Endpoint
 @api_router.post("/summarize")
-async def summarize_content(request: SummaryRequest, session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
+async def summarize_content(request: SummaryRequest, background_tasks: BackgroundTasks, user: dict = Depends(current_user)):
     try:
         if not openai_client:
             raise HTTPException(status_code=503, detail="AI service not configured")
 
-        system_message = "You are an expert at creating concise, informative summaries. Summarize the given content in under 150 words, highlighting key points and main ideas."
+        summary_messages = [
+            {"role": "system", "content": SUMMARY_SYSTEM_MESSAGE},
+            {"role": "user", "content": f"Summarize this content:\n\n{request.content}"}
+        ]
 
-        completion = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Summarize this content:\n\n{request.content}"}
-            ]
-        )
+        if request.stream:
+            async def event_stream():
+                try:
+                    # Hold the slot for the whole generation, not just the request that starts it
+                    async with openai_slot(user['id']):
+                        completion = await openai_client.chat.completions.create(
+                            model="gpt-4o-mini",
+                            messages=summary_messages,
+                            stream=True
+                        )
+                        async for chunk in completion:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                yield sse_event({"delta": delta})
+
+                    # Queued only on success; runs once the stream has closed
+                    background_tasks.add_task(increment_progress, user['id'], 5)
+                    yield sse_event({"done": True})
+                except Exception as e:
+                    logging.error(f"Summarization stream error: {e}")
+                    yield sse_event({"error": "Summarization stream failed"})
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream", background=background_tasks)
+
+        async with openai_slot(user['id']):
+            completion = await openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=summary_messages
+            )
         response = completion.choices[0].message.content
 
-        # Update progress
-        progress_response = supabase.table('progress').select('*').eq('user_id', user['id']).maybeSingle().execute()
-        if progress_response.data:
-            new_xp = progress_response.data['xp_points'] + 5
-            supabase.table('progress').update({
-                'xp_points': new_xp,
-                'last_activity': datetime.now(timezone.utc).isoformat()
-            }).eq('user_id', user['id']).execute()
+        # Update progress after the response is sent
+        background_tasks.add_task(increment_progress, user['id'], 5)
 
         return {"summary": response}
 
@@ -427,42 +668,59 @@ async def summarize_content(request: SummaryRequest, session_token: Optional[str
 
 # Progress Endpoint
 @api_router.get("/progress")
-async def get_progress(session_token: Optional[str] = Cookie(None)):
-    user = await get_user_from_token(session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+async def get_progress(user: dict = Depends(current_user)):
+    cache_key = f"prog:{user['id']}"
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return ORJSONResponse(cached)
 
-    response = supabase.table('progress').select('*').eq('user_id', user['id']).maybeSingle().execute()
+    response = await supabase.table('progress').select('*').eq('user_id', user['id']).maybe_single().execute()
 
     if not response.data:
-        # Create initial progress
+        # Create initial progress (last_activity defaults to now())
         progress_data = {
             'user_id': user['id'],
             'xp_points': 0,
             'topics_learned': [],
-            'learning_streak': 0,
-            'last_activity': datetime.now(timezone.utc).isoformat()
+            'learning_streak': 0
         }
-        create_response = supabase.table('progress').insert(progress_data).execute()
-        return create_response.data[0]
+        create_response = await supabase.table('progress').insert(progress_data).execute()
+        return ORJSONResponse(create_response.data[0])
 
-    return response.data
+    await cache_set(cache_key, response.data, USER_DATA_CACHE_TTL)
+
+    return ORJSONResponse(response.data)
 
 # Topics endpoint
+TOPICS = [
+    {"id": "math", "name": "Mathematics", "icon": "calculator"},
+    {"id": "python", "name": "Python Programming", "icon": "code"},
+    {"id": "biology", "name": "Biology", "icon": "leaf"},
+    {"id": "english", "name": "English", "icon": "book-open"},
+    {"id": "history", "name": "History", "icon": "landmark"},
+    {"id": "physics", "name": "Physics", "icon": "atom"},
+    {"id": "chemistry", "name": "Chemistry", "icon": "flask"},
+    {"id": "art", "name": "Art & Design", "icon": "palette"}
+]
+
+# The topic list is static, so serialize it once and let clients cache it
+TOPICS_BODY = orjson.dumps({"topics": TOPICS})
+TOPICS_ETAG = f'"{hashlib.md5(TOPICS_BODY).hexdigest()}"'
+TOPICS_HEADERS = {"ETag": TOPICS_ETAG, "Cache-Control": "public, max-age=86400, immutable"}
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Accept "*", lists of tags, and weak tags added by compressing proxies
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
 @api_router.get("/topics")
-async def get_topics():
-    return {
-        "topics": [
-            {"id": "math", "name": "Mathematics", "icon": "calculator"},
-            {"id": "python", "name": "Python Programming", "icon": "code"},
-            {"id": "biology", "name": "Biology", "icon": "leaf"},
-            {"id": "english", "name": "English", "icon": "book-open"},
-            {"id": "history", "name": "History", "icon": "landmark"},
-            {"id": "physics", "name": "Physics", "icon": "atom"},
-            {"id": "chemistry", "name": "Chemistry", "icon": "flask"},
-            {"id": "art", "name": "Art & Design", "icon": "palette"}
-        ]
-    }
+async def get_topics(request: Request):
+    if etag_matches(request.headers.get("if-none-match"), TOPICS_ETAG):
+        return Response(status_code=304, headers=TOPICS_HEADERS)
+
+    return Response(content=TOPICS_BODY, media_type="application/json", headers=TOPICS_HEADERS)
 
 app.include_router(api_router)
 
@@ -474,8 +732,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Levels understood by both logging and Uvicorn; anything else falls back to INFO
+LOG_LEVELS = ("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG")
+LOG_LEVEL_SETTING = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_LEVEL = "WARNING" if LOG_LEVEL_SETTING == "WARN" else LOG_LEVEL_SETTING
+if LOG_LEVEL not in LOG_LEVELS:
+    LOG_LEVEL = "INFO"
+
 logging.basicConfig(
-    level=logging.INFO,
+    level=LOG_LEVEL,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+
+if LOG_LEVEL_SETTING not in (LOG_LEVEL, "WARN"):
+    logger.warning(f"Unknown LOG_LEVEL {LOG_LEVEL_SETTING!r}, using INFO")
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "server:app",
+        app_dir=str(Path(__file__).parent),
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 8000)),
+        loop="uvloop",
+        http="httptools",
+        workers=WORKERS,
+        proxy_headers=True,
+        log_level=LOG_LEVEL.lower(),
+        access_log=LOG_LEVEL == "DEBUG"
+    )
@@ -76,21 +76,77 @@ export default function AITutor() {
     setLoading(true);
 
     try {
-      const response = await axios.post(`${API}/chat`, {
-        message: inputMessage,
-        topic: selectedTopic.name,
-        chat_id: chatId
+      // Stream the reply so tokens render as they arrive (axios cannot read a streaming body)
+      const response = await fetch(`${API}/chat`, {
+        method: 'POST',
+        credentials: 'include',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          message: inputMessage,
+          topic: selectedTopic.name,
+          chat_id: chatId,
+          stream: true
+        })
       });
 
-      setChatId(response.data.chat_id);
+      if (!response.ok || !response.body) {
+        throw new Error(`Chat request failed with status ${response.status}`);
+      }
 
-      const aiMessage = {
-        role: 'assistant',
-        content: response.data.response,
-        timestamp: response.data.timestamp
-      };
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let started = false;
 
-      setMessages(prev => [...prev, aiMessage]);
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        // Server-sent events are separated by a blank line
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+
+        for (const event of events) {
+          if (!event.startsWith('data: ')) continue;
+          const data = JSON.parse(event.slice(6));
+
+          // Sent first, so a failed stream still continues the same chat
+          if (data.chat_id) {
+            setChatId(data.chat_id);
+          }
+
+          if (data.error) {
+            throw new Error(data.error);
+          }
+
+          if (data.delta) {
+            if (!started) {
+              started = true;
+              setMessages(prev => [...prev, {
+                role: 'assistant',
+                content: data.delta,
+                timestamp: new Date().toISOString()
+              }]);
+            } else {
+              setMessages(prev => {
+                const last = prev[prev.length - 1];
+                return [...prev.slice(0, -1), { ...last, content: last.content + data.delta }];
+              });
+            }
+          }
+
+          if (data.done) {
+            // Without any delta the last message is still the user's own
+            if (started) {
+              setMessages(prev => {
+                const last = prev[prev.length - 1];
+                return [...prev.slice(0, -1), { ...last, timestamp: data.timestamp }];
+              });
+            }
+          }
+        }
+      }
     } catch (error) {
       console.error('Chat error:', error);
       toast.error('Failed to send message. Please try again.');
@@ -190,7 +246,7 @@ export default function AITutor() {
                         </div>
                       </div>
                     ))}
-                    {loading && (
+                    {loading && messages[messages.length - 1]?.role === 'user' && (
                       <div className="flex justify-start" data-testid="chat-loading">
                         <div className="bg-gray-100 p-4 rounded-2xl">
                           <Loader2 className="h-5 w-5 animate-spin text-blue-500" />
@@ -0,0 +1,17 @@
+import pytest
+
+from backend_test import LearnMateAPITester, ALL_PROBES
+
+
+def pytest_generate_tests(metafunc):
+    if "probe" in metafunc.fixturenames:
+        metafunc.parametrize("probe", ALL_PROBES, ids=[probe[0] for probe in ALL_PROBES])
+
+
+@pytest.fixture(scope="session")
+def tester():
+    """One warmed-up HTTP/2 client per xdist worker"""
+    tester = LearnMateAPITester(verbose=True)
+    tester.warm_up()
+    yield tester
+    tester.session.close()
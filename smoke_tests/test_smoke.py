@@ -0,0 +1,26 @@
+import pytest
+
+# Live-deployment checks; `pytest -n auto smoke_tests` fans these out across
+# xdist workers, each sharing one tester from the session fixture in conftest.py
+pytestmark = pytest.mark.smoke
+
+
+def test_topics(tester):
+    assert tester.test_topics_endpoint()
+
+def test_auth_me(tester):
+    assert tester.test_auth_me_without_session()
+
+def test_invalid_session(tester):
+    assert tester.test_invalid_session_processing()
+
+def test_logout(tester):
+    assert tester.test_logout_without_session()
+
+def test_no_auth_probe(tester, probe):
+    name, method, endpoint, expected_status, data = probe
+    success, _ = tester.run_test(name, method, endpoint, expected_status, data)
+    assert success
+
+def test_response_times(tester):
+    assert tester.test_api_response_times()
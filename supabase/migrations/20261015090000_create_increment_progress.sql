@@ -0,0 +1,30 @@
+/*
+  # Atomic progress updates
+
+  ## Overview
+  Adds an `increment_progress` function so XP and topic updates happen in a
+  single statement instead of a read-modify-write from the API.
+
+  ## New Functions
+
+  1. **increment_progress(uid, dxp, topic)**
+     - `uid` (uuid) - User whose progress row is updated
+     - `dxp` (integer) - XP points to add
+     - `topic` (text, nullable) - Topic to append to `topics_learned` if not already present
+     - Always refreshes `last_activity`
+*/
+
+CREATE OR REPLACE FUNCTION increment_progress(uid uuid, dxp integer, topic text DEFAULT NULL)
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE progress
+  SET
+    xp_points = xp_points + dxp,
+    topics_learned = CASE
+      WHEN topic IS NULL OR topic = ANY(coalesce(topics_learned, '{}')) THEN topics_learned
+      ELSE array_append(coalesce(topics_learned, '{}'), topic)
+    END,
+    last_activity = now()
+  WHERE user_id = uid;
+$$;
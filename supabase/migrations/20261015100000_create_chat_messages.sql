@@ -0,0 +1,67 @@
+/*
+  # Chat messages table
+
+  ## Overview
+  Moves chat messages out of the `chat_history.messages` JSON array into their
+  own table so each chat turn inserts two rows instead of rewriting the whole
+  conversation.
+
+  ## New Tables
+
+  1. **chat_messages**
+     - `id` (uuid, primary key) - Message identifier
+     - `chat_id` (uuid, foreign key) - Reference to chat_history table
+     - `role` (text) - `user` or `assistant`
+     - `content` (text) - Message body
+     - `timestamp` (timestamptz) - When the message was sent
+
+  ## Data Migration
+  - Existing `chat_history.messages` entries are copied into `chat_messages`
+    and the legacy column is reset to an empty array
+
+  ## Security
+  - Enable RLS on chat_messages
+  - Users can only access messages of their own chats
+*/
+
+-- Create chat_messages table
+CREATE TABLE IF NOT EXISTS chat_messages (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  chat_id uuid NOT NULL REFERENCES chat_history(id) ON DELETE CASCADE,
+  role text NOT NULL,
+  content text NOT NULL,
+  timestamp timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_chat_id_timestamp ON chat_messages(chat_id, timestamp);
+
+-- Copy existing messages out of the JSON array
+INSERT INTO chat_messages (chat_id, role, content, timestamp)
+SELECT
+  chat_history.id,
+  message->>'role',
+  message->>'content',
+  coalesce((message->>'timestamp')::timestamptz, chat_history.created_at)
+FROM chat_history, jsonb_array_elements(chat_history.messages) AS message;
+
+UPDATE chat_history SET messages = '[]'::jsonb WHERE messages <> '[]'::jsonb;
+
+-- Enable Row Level Security
+ALTER TABLE chat_messages ENABLE ROW LEVEL SECURITY;
+
+-- RLS Policies for chat_messages table
+CREATE POLICY "Users can view own chat messages"
+  ON chat_messages FOR SELECT
+  TO authenticated
+  USING (EXISTS (
+    SELECT 1 FROM chat_history
+    WHERE chat_history.id = chat_messages.chat_id AND chat_history.user_id = auth.uid()
+  ));
+
+CREATE POLICY "Users can insert own chat messages"
+  ON chat_messages FOR INSERT
+  TO authenticated
+  WITH CHECK (EXISTS (
+    SELECT 1 FROM chat_history
+    WHERE chat_history.id = chat_messages.chat_id AND chat_history.user_id = auth.uid()
+  ));
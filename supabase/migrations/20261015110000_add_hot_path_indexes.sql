@@ -0,0 +1,36 @@
+/*
+  # Hot-path indexes
+
+  ## Overview
+  Aligns indexes with the queries the API runs on every request.
+
+  ## Changes
+
+  1. **sessions**
+     - Add `idx_sessions_expires_at` so expired sessions can be swept by range
+     - Drop `idx_sessions_token`; the UNIQUE constraint on `session_token` already indexes it
+
+  2. **chat_history**
+     - Replace `idx_chat_history_user_id` with `(user_id, created_at DESC)` to serve the
+       per-user, newest-first history listing without a sort
+
+  3. **quiz_results**
+     - Replace `idx_quiz_results_user_id` with `(user_id, created_at DESC)` for the same reason
+
+  4. **progress**
+     - Drop `idx_progress_user_id`; the UNIQUE constraint on `user_id` already indexes it
+
+  ## Notes
+  - `users.email` is already covered by its UNIQUE constraint
+*/
+
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at);
+DROP INDEX IF EXISTS idx_sessions_token;
+
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_id_created_at ON chat_history(user_id, created_at DESC);
+DROP INDEX IF EXISTS idx_chat_history_user_id;
+
+CREATE INDEX IF NOT EXISTS idx_quiz_results_user_id_created_at ON quiz_results(user_id, created_at DESC);
+DROP INDEX IF EXISTS idx_quiz_results_user_id;
+
+DROP INDEX IF EXISTS idx_progress_user_id;